@@ -34,7 +34,9 @@ Where:
 
 import os
 import csv
+import functools
 import itertools
+import operator
 import random
 
 # ---------------------------------------------------------
@@ -56,6 +58,24 @@ def create_filename(sub_label: str, vowel: str) -> str:
         consonant = B_CONSONANTS[sub_label]
     return f"{sub_label}_{vowel}_{consonant}.wav"
 
+# Vowel options per sub-label, e.g. 'A1' -> ['e','i'], 'B2' -> ['o','u']
+SUB_VOWELS = {sub: (A_VOWELS if sub[0] == 'A' else B_VOWELS) for sub in {**A_CONSONANTS, **B_CONSONANTS}}
+
+# Pre-built filename table, e.g. ('A1','e') -> 'A1_e_b.wav'
+FILENAME_CACHE = {(sub, v): create_filename(sub, v) for sub, vowels in SUB_VOWELS.items() for v in vowels}
+
+# Sub-labels per category, and the two other sub-labels of the same category
+A_KEYS = tuple(A_CONSONANTS)  # ('A1','A2','A3')
+B_KEYS = tuple(B_CONSONANTS)  # ('B1','B2','B3')
+OTHER_SUBS = {sub: tuple(s for s in keys if s != sub) for keys in (A_KEYS, B_KEYS) for sub in keys}
+# ... and all sub-labels of the opposite category
+CROSS_SUBS = {sub: (B_KEYS if sub[0] == 'A' else A_KEYS) for sub in SUB_VOWELS}
+
+# Candidate new sub-labels for the violated position, per violation type:
+#   replacement   -> A->B or B->A
+#   concatenation -> same A/B category but a different sub
+VIOLATION_SUBS = {'replacement': CROSS_SUBS, 'concatenation': OTHER_SUBS}
+
 
 # ---------------------------------------------------------
 # 2) Define permutations for short(4) and long(6) sequences (Bahlmann 2008)
@@ -93,53 +113,74 @@ ADJACENT_LONG_PATTERNS = [
     ('A3','B3','A2','B2','A1','B1')
 ]
 
+# (grammar, seq_length) -> pattern list
+_PATTERN_TABLE = {
+    ('HDR','short'): HIERARCHICAL_SHORT_PATTERNS,
+    ('HDR','long'):  HIERARCHICAL_LONG_PATTERNS,
+    ('ADR','short'): ADJACENT_SHORT_PATTERNS,
+    ('ADR','long'):  ADJACENT_LONG_PATTERNS,
+}
+
 # ---------------------------------------------------------
 # 3) Generate GRAMMATICAL sequences with pattern label
 # ---------------------------------------------------------
-def generate_grammatical_sequences(grammar: str, seq_length: str):
+def iter_grammatical_sequences(grammar: str, seq_length: str):
     """
-    Returns a list of tuples: [(patternStr, [syllFile1, syllFile2, ...]), ...]
+    Lazily yields (patternTuple, (syllFile1, syllFile2, ...)) one sequence at a time.
     """
-    if grammar=='HDR' and seq_length=='short':
-        patterns = HIERARCHICAL_SHORT_PATTERNS
-    elif grammar=='HDR' and seq_length=='long':
-        patterns = HIERARCHICAL_LONG_PATTERNS
-    elif grammar=='ADR' and seq_length=='short':
-        patterns = ADJACENT_SHORT_PATTERNS
-    else:
-        patterns = ADJACENT_LONG_PATTERNS
-    
-    results = []
+    # Anything that is not HDR/short, HDR/long or ADR/short falls back to ADR/long
+    patterns = _PATTERN_TABLE.get((grammar, seq_length), ADJACENT_LONG_PATTERNS)
+
     for pattern_tuple in patterns:
         # pattern_tuple example: ('A1','A2','B2','B1')
-        # convert to string e.g. "A1A2B2B1"
-        pattern_str = "".join(pattern_tuple)
-
+        # (joined into the "A1A2B2B1" pattern string only when writing the CSV)
         a_indices = [i for i, x in enumerate(pattern_tuple) if x.startswith('A')]
         b_indices = [i for i, x in enumerate(pattern_tuple) if x.startswith('B')]
 
-        for a_combo in itertools.product(A_VOWELS, repeat=len(a_indices)):
-            for b_combo in itertools.product(B_VOWELS, repeat=len(b_indices)):
-                seq = [None]*len(pattern_tuple)
-                # Fill A positions
-                for idx_a, vow in zip(a_indices, a_combo):
-                    seq[idx_a] = create_filename(pattern_tuple[idx_a], vow)
-                # Fill B positions
-                for idx_b, vow in zip(b_indices, b_combo):
-                    seq[idx_b] = create_filename(pattern_tuple[idx_b], vow)
+        # One filename list per slot, A slots first then B slots, so that a single
+        # product over the slots enumerates A-vowel combos (outer) x B-vowel combos (inner)
+        ab_indices = a_indices + b_indices
+        slot_files = [
+            [FILENAME_CACHE[(pattern_tuple[i], vow)] for vow in SUB_VOWELS[pattern_tuple[i]]]
+            for i in ab_indices
+        ]
 
-                results.append((pattern_str, seq))
+        # Position i of the sequence takes element slot_order[i] of the slot tuple
+        slot_order = [ab_indices.index(i) for i in range(len(pattern_tuple))]
+        pick = operator.itemgetter(*slot_order)
 
-    return results
+        for files in itertools.product(*slot_files):
+            seq = pick(files)  # tuple in pattern order
+
+            yield (pattern_tuple, seq)
+
+
+@functools.lru_cache(maxsize=None)
+def generate_grammatical_sequences(grammar: str, seq_length: str):
+    """
+    Returns a tuple of tuples: ((patternTuple, (syllFile1, syllFile2, ...)), ...)
+    The result is cached per (grammar, seq_length), so it is immutable.
+    """
+    return tuple(iter_grammatical_sequences(grammar, seq_length))
 
 # ---------------------------------------------------------
 # 4) Generate UNGRAMMATICAL sequences
-#    returns list of (patternStr, [filename1, filename2, ...])
+#    returns list of (patternTuple, [filename1, filename2, ...])
 # ---------------------------------------------------------
+def violate_syllable(old_sub: str, swap_subs: dict, choice=random.choice) -> str:
+    """
+    Draw a new filename for a position that holds `old_sub`:
+    a sub-label from swap_subs[old_sub], then one of that sub-label's vowels.
+    """
+    new_sub = choice(swap_subs[old_sub])
+    new_vow = choice(SUB_VOWELS[new_sub])
+    return FILENAME_CACHE[(new_sub, new_vow)]
+
+
 def generate_ungrammatical_sequences(grammar: str, seq_length: str, violation_type: str, sample_size=50):
     """
     Minimal random generation of ungrammatical sequences.
-    We use the same patternStr from the original grammar pattern, but we break 1 position
+    We keep the original grammar pattern, but we break 1 position
     in the tail to produce violation.
     """
     # Start from grammatical
@@ -149,6 +190,8 @@ def generate_ungrammatical_sequences(grammar: str, seq_length: str, violation_ty
 
     base_samples = random.sample(gram_list, min(sample_size, len(gram_list)))
     results = []
+    choice = random.choice  # local binding for the loop below
+    swap_subs = VIOLATION_SUBS.get(violation_type)
 
     # short => tail pos in [-2, -1], long => [-3, -2, -1]
     if seq_length=='short':
@@ -156,48 +199,19 @@ def generate_ungrammatical_sequences(grammar: str, seq_length: str, violation_ty
     else:
         tail_positions = [-3, -2, -1]
 
-    for (pattern_str, seq) in base_samples:
-        seq_copy = seq[:]
-        pos = random.choice(tail_positions)
-        old_filename = seq_copy[pos]
-
-        # parse e.g. "A1_e_b.wav" -> ["A1","e","b"]
-        no_ext = old_filename[:-4]  # remove ".wav"
-        parts = no_ext.split('_')  # e.g. ['A1','e','b']
-
-        if violation_type=='replacement':
-            # A->B or B->A
-            if parts[0].startswith('A'):
-                new_sub = random.choice(list(B_CONSONANTS.keys()))
-                new_vow = random.choice(B_VOWELS)
-                seq_copy[pos] = create_filename(new_sub, new_vow)
-            else:
-                new_sub = random.choice(list(A_CONSONANTS.keys()))
-                new_vow = random.choice(A_VOWELS)
-                seq_copy[pos] = create_filename(new_sub, new_vow)
-
-        elif violation_type=='concatenation':
-            # keep same A/B category but different sub
-            if parts[0].startswith('A'):
-                old_sub = parts[0]
-                possible_subs = ['A1','A2','A3']
-                possible_subs.remove(old_sub)
-                new_sub = random.choice(possible_subs)
-                new_vow = random.choice(A_VOWELS)
-                seq_copy[pos] = create_filename(new_sub, new_vow)
-            else:
-                old_sub = parts[0]
-                possible_subs = ['B1','B2','B3']
-                possible_subs.remove(old_sub)
-                new_sub = random.choice(possible_subs)
-                new_vow = random.choice(B_VOWELS)
-                seq_copy[pos] = create_filename(new_sub, new_vow)
-
-        # We might keep patternStr the same, or add e.g. "*v" to denote it's violated.
-        # For clarity, let's do patternStr + "_X" to indicate ungrammatical:
-        # or just keep it the same. I'll keep the same for now, or you could do:
-        # pattern_str = pattern_str + "Viol"
-        results.append((pattern_str, seq_copy))
+    for (pattern_tuple, seq) in base_samples:
+        seq_copy = list(seq)  # cached grammatical sequences are tuples
+        pos = choice(tail_positions)
+        # The pattern already names the sub-label at every position, e.g. 'A1'
+        old_sub = pattern_tuple[pos]
+
+        if swap_subs is not None:
+            seq_copy[pos] = violate_syllable(old_sub, swap_subs, choice)
+
+        # We might keep the pattern the same, or add e.g. "*v" to denote it's violated.
+        # For clarity, let's do pattern + "_X" to indicate ungrammatical:
+        # or just keep it the same. I'll keep the same for now.
+        results.append((pattern_tuple, seq_copy))
 
     return results
 
@@ -205,18 +219,14 @@ def generate_ungrammatical_sequences(grammar: str, seq_length: str, violation_ty
 # ---------------------------------------------------------
 # 5) Save to CSV with pattern column
 # ---------------------------------------------------------
-def save_sequences_to_csv(csv_filename, data):
+def save_sequences_to_csv(out_folder, csv_filename, data):
     """
-    data: list of (patternStr, [filename1, filename2, ...])
+    out_folder: existing output folder (created once in main)
+    data: list of (patternTuple, [filename1, filename2, ...])
 
     We'll produce CSV columns:
       pattern, seqID, syll_1, ..., syll_n
     """
-    current_dir = os.getcwd()
-    parent_dir = os.path.dirname(current_dir)
-    out_folder = os.path.join(parent_dir, "stimuli", "sequences", "sequences_csv")
-    os.makedirs(out_folder, exist_ok=True)
-
     outpath = os.path.join(out_folder, csv_filename)
     if not data:
         with open(outpath, 'w', newline='', encoding='utf-8') as f:
@@ -228,13 +238,17 @@ def save_sequences_to_csv(csv_filename, data):
     max_syll_len = max(len(seq) for (_, seq) in data)
     headers = ["pattern", "seqID"] + [f"syll_{i+1}" for i in range(max_syll_len)]
 
-    with open(outpath, 'w', newline='', encoding='utf-8') as f:
+    # Build all rows first, then hand them to the writer in one batch
+    # through a large buffer (one flush instead of many small writes).
+    rows = [
+        ["".join(pattern_tuple), f"seq_{idx:04d}", *seq_list]
+        for idx, (pattern_tuple, seq_list) in enumerate(data)
+    ]
+
+    with open(outpath, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
         writer = csv.writer(f)
         writer.writerow(headers)
-
-        for idx, (pattern_str, seq_list) in enumerate(data):
-            row = [pattern_str, f"seq_{idx:04d}"] + seq_list
-            writer.writerow(row)
+        writer.writerows(rows)
 
 
 # ---------------------------------------------------------
@@ -243,6 +257,12 @@ def save_sequences_to_csv(csv_filename, data):
 def main():
     random.seed(42)  # reproducible
 
+    # Output folder is the same for all 12 CSVs: create it once
+    current_dir = os.getcwd()
+    parent_dir = os.path.dirname(current_dir)
+    out_folder = os.path.join(parent_dir, "stimuli", "sequences", "sequences_csv")
+    os.makedirs(out_folder, exist_ok=True)
+
     grammars = ['ADR','HDR']
     lengths = ['short','long']
     violation_types = ['replacement','concatenation']
@@ -252,13 +272,13 @@ def main():
             # A) Grammatical
             gramm_data = generate_grammatical_sequences(g, l)
             fname_g = f"{g}_grammatical_{l}.csv"
-            save_sequences_to_csv(fname_g, gramm_data)
+            save_sequences_to_csv(out_folder, fname_g, gramm_data)
 
             # B) Ungrammatical
             for v in violation_types:
                 ungram_data = generate_ungrammatical_sequences(g, l, v, sample_size=50)
                 fname_u = f"{g}_{v}_{l}.csv"
-                save_sequences_to_csv(fname_u, ungram_data)
+                save_sequences_to_csv(out_folder, fname_u, ungram_data)
 
     print("All CSV (12 types) have been saved under 'stimuli/sequences/sequences_csv'.")
 
@@ -24,42 +24,161 @@ Usage:
 
 import os
 import csv
-from pydub import AudioSegment
+import struct
+from multiprocessing import Pool
 
-def generate_sequence_wav(seq_id, syllable_files, output_dir, ISI_MS=100, target_sr=48000):
+import numpy as np
+from scipy.io import wavfile
+
+# All syllables are resampled to this rate upstream (see stimuli/scr05)
+TARGET_SR = 48000
+
+def load_syllable_cache(syllables_path, target_sr=TARGET_SR):
+    """
+    Read every single-syllable .wav in `syllables_path` once.
+    Returns a dict: { 'A1_e_b.wav': (sr, samples), ... }
+    There are only a handful of syllables, reused by thousands of sequences.
+    Samples are memory-mapped (read-only), so they are copied straight from the
+    page cache into each output buffer.
+
+    Every syllable must be at `target_sr` and all must share one channel count
+    and sample format. This is checked here, once, so a bad input stops the run
+    before any sequence is built instead of failing inside a Pool worker.
+    """
+    cache = {}
+    if not os.path.isdir(syllables_path):
+        return cache
+    for f in os.listdir(syllables_path):
+        if f.lower().endswith(".wav"):
+            sr, samples = wavfile.read(os.path.join(syllables_path, f), mmap=True)
+            if sr != target_sr:
+                raise ValueError(f"{f} has sampling rate {sr} Hz, expected {target_sr} Hz.")
+            cache[f] = (sr, samples)
+
+    # (channel shape, dtype) per syllable, e.g. ((), int16) for mono 16-bit
+    layouts = {(samples.shape[1:], samples.dtype) for _, samples in cache.values()}
+    if len(layouts) > 1:
+        raise ValueError(f"Syllables in {syllables_path} mix channel counts or sample formats: "
+                         f"{sorted(str(layout) for layout in layouts)}")
+    return cache
+
+
+# WAV chunk header ('RIFF', 'fmt ', 'fact', 'data'): 4-byte id + little-endian size
+CHUNK_HEADER = struct.Struct('<4sI')
+# 'fmt ' chunk body: format tag, channels, sample rate, byte rate, block align, bits per sample
+FMT_BODY = struct.Struct('<HHIIHH')
+
+# Sample formats write_wav stores as-is, keyed by (dtype.kind, itemsize) -> format tag.
+# Anything else (e.g. 24-bit input, which scipy reads as int32) is rejected instead of
+# being silently written back at a different bit depth.
+WAV_FORMAT_TAGS = {
+    ('u', 1): 1,  # 8-bit PCM (unsigned)
+    ('i', 2): 1,  # 16-bit PCM
+    ('f', 4): 3,  # 32-bit IEEE float
+}
+
+def _write_all(f, buf):
+    """ Write every byte of `buf` (bytes or a uint8 array) to the unbuffered file `f` (write() may be partial). """
+    view = memoryview(buf)
+    while view:
+        written = f.write(view)
+        view = view[written:]
+
+def write_wav(path, sr, samples):
+    """
+    Write `samples` (uint8/int16 PCM or float32, 1-D or (n, channels)) as a .wav file:
+    a packed header, then the sample buffer itself (no second copy of the audio).
+    Float output gets the 18-byte 'fmt ' chunk and a 'fact' chunk; odd-length data
+    gets the RIFF pad byte.
+    """
+    fmt_tag = WAV_FORMAT_TAGS.get((samples.dtype.kind, samples.dtype.itemsize))
+    if fmt_tag is None:
+        raise ValueError(f"Cannot write {samples.dtype} samples to {path}: "
+                         f"expected uint8, int16 or float32.")
+
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    width = samples.dtype.itemsize
+    data = np.ascontiguousarray(samples, dtype=samples.dtype.newbyteorder('<'))
+    data_len = data.nbytes
+    pad = data_len % 2
+
+    fmt_body = FMT_BODY.pack(fmt_tag, channels, sr, sr * channels * width, channels * width, width * 8)
+    fact = b''
+    if fmt_tag == 3:
+        fmt_body += struct.pack('<H', 0)  # cbSize: no extension
+        fact = CHUNK_HEADER.pack(b'fact', 4) + struct.pack('<I', len(data))  # sample frames
+
+    riff_size = 4 + CHUNK_HEADER.size + len(fmt_body) + len(fact) + CHUNK_HEADER.size + data_len + pad
+    header = b''.join([
+        CHUNK_HEADER.pack(b'RIFF', riff_size), b'WAVE',
+        CHUNK_HEADER.pack(b'fmt ', len(fmt_body)), fmt_body,
+        fact,
+        CHUNK_HEADER.pack(b'data', data_len),
+    ])
+    with open(path, 'wb', buffering=0) as f:
+        _write_all(f, header)
+        if data_len:
+            _write_all(f, data.reshape(-1).view(np.uint8))  # byte view, no copy
+        if pad:
+            _write_all(f, b'\x00')
+
+
+def generate_sequence_wav(seq_id, syllable_files, output_dir, ISI_MS=100, target_sr=TARGET_SR):
     """
     Merge multiple single-syllable .wav files (with same audio params)
     into one .wav file for the given seq_id.
+    Syllable samples come from SYLL_CACHE (already checked to be at target_sr with one
+    channel layout); each syllable is followed by ISI_MS of silence.
     """
     os.makedirs(output_dir, exist_ok=True)
-    combined = AudioSegment.empty()
+    segments = []
 
     for f in syllable_files:
-        audio_path = os.path.join(SYLLABLES_PATH, f)
-        if not os.path.isfile(audio_path):
-            print(f"[Warning] File not found: {audio_path}, skipping.")
+        if f not in SYLL_CACHE:
+            print(f"[Warning] File not found: {os.path.join(SYLLABLES_PATH, f)}, skipping.")
             continue
 
-        segment = AudioSegment.from_wav(audio_path)
-        
-        # Ensure consistent sampling rate
-        segment = segment.set_frame_rate(target_sr)
+        _, samples = SYLL_CACHE[f]
+        segments.append(samples)
+
+    if segments:
+        # Allocate the whole output once (zeros = ISI silence), then copy each syllable in place.
+        # The ISI is exactly ISI_MS (4800 samples at 48 kHz); pydub's silent() used to
+        # come out a few samples short (~4794) after its own resampling.
+        isi_len = int(target_sr * ISI_MS / 1000)
+        total_len = sum(len(seg) for seg in segments) + len(segments) * isi_len
+        combined = np.zeros((total_len,) + segments[0].shape[1:], dtype=segments[0].dtype)
 
-        # Add segment and insert ISI silence
-        combined += segment + AudioSegment.silent(duration=ISI_MS)
+        start = 0
+        for seg in segments:
+            combined[start:start + len(seg)] = seg
+            start += len(seg) + isi_len
+    else:
+        combined = np.zeros(0, dtype=np.int16)
 
     out_wav_path = os.path.join(output_dir, f"{seq_id}.wav")
-    combined.export(out_wav_path, format="wav")
+    write_wav(out_wav_path, target_sr, combined)
     return out_wav_path
 
 
-def process_csv_file(csv_path, output_subdir, limit_count=None):
+def _build_one(job):
+    """
+    Pool worker: unpack one (seq_id, syllable_files, output_dir) job
+    and build its combined .wav.
+    """
+    seq_id, syllable_files, output_dir = job
+    return generate_sequence_wav(seq_id, syllable_files, output_dir)
+
+
+def process_csv_file(csv_path, output_subdir, pool, limit_count=None):
     """
     Read `csv_path`, for each row gather syllable filenames, then call `generate_sequence_wav`
     to produce a combined .wav in `output_subdir`.
+    Rows are independent, so the .wav files are built in parallel.
 
     :param csv_path: full path to a .csv file (e.g. 'ADR_grammatical_short.csv')
     :param output_subdir: folder to place final .wav
+    :param pool: multiprocessing Pool shared by all CSVs (created once in main)
     :param limit_count: if not None, limit how many rows to process
     """
     if not os.path.isfile(csv_path):
@@ -68,39 +187,49 @@ def process_csv_file(csv_path, output_subdir, limit_count=None):
 
     os.makedirs(output_subdir, exist_ok=True)
 
+    # 1) Read the whole CSV first and collect one job per row
+    jobs = []
     with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for idx, row in enumerate(reader):
+        reader = csv.reader(f)
+        headers = next(reader, [])
+
+        if 'pattern' not in headers:
+            print("[Error] CSV must have a 'pattern' column.")
+            return
+
+        # Resolve column positions once from the header
+        # e.g. 'syll_1', 'syll_2', ...
+        pattern_idx = headers.index('pattern')
+        syll_idxs = [i for i, h in enumerate(headers) if h.startswith("syll_")]
+
+        # Skip blank / truncated rows without counting them, like csv.DictReader did
+        rows = (row for row in reader if len(row) > pattern_idx)
+        for idx, row in enumerate(rows):
             if limit_count is not None and idx >= limit_count:
                 break
-            seq_id = row["seqID"]
-            syllables = [row[col] for col in row if col.startswith("syll_")]
 
-            if 'pattern' not in row:
-                print("[Error] CSV must have a 'pattern' column.")
-                continue
+            pattern = row[pattern_idx]  # e.g. "A1A2B2B1"
 
-            pattern = row['pattern']  # e.g. "A1A2B2B1"
+            # 2) Gather all syllable filenames (skip empty columns)
+            syllables = [row[i] for i in syll_idxs if i < len(row) and row[i]]
 
-            # 2) Gather all syllable filenames
-            # e.g. 'syll_1', 'syll_2', ...
-            # to build absolute paths
+            # keep only syllables that were loaded into SYLL_CACHE
+            # (a dict lookup instead of one os.path.isfile per syllable)
             syll_files = []
-            for k in row:
-                if k.startswith("syll_"):
-                    wav_name = row[k]  # e.g. "A1_e_b.wav"
-                    if wav_name:       # skip empty columns
-                        full_path = os.path.join(SYLLABLES_PATH, wav_name)
-                        if not os.path.isfile(full_path):
-                            print(f"[Warning] File not found: {full_path}. Skipping.")
-                            continue
-                        syll_files.append(full_path)
+            for wav_name in syllables:  # e.g. "A1_e_b.wav"
+                if wav_name not in SYLL_CACHE:
+                    print(f"[Warning] File not found: {os.path.join(SYLLABLES_PATH, wav_name)}. Skipping.")
+                    continue
+                syll_files.append(wav_name)
 
             # 3) Output file naming: pattern_index.wav
             out_filename = f"{pattern}_{idx}"  
             
-            out_path = generate_sequence_wav(out_filename, syllables, output_subdir)
-            print(f"Combined -> {out_path}")
+            jobs.append((out_filename, syll_files, output_subdir))
+
+    # 4) Build all sequences in parallel (rows have no cross-row dependency)
+    for out_path in pool.imap_unordered(_build_one, jobs, chunksize=16):
+        print(f"Combined -> {out_path}")
 
 
 # ----------------------------------------------------------------------------------------
@@ -113,30 +242,35 @@ SEQUENCES_CSV_DIR = os.path.join(PARENT_DIR, "stimuli", "sequences", "sequences_
 SYLLABLES_PATH    = os.path.join(PARENT_DIR, "stimuli", "processed", "stim_syllables")
 COMBINED_WAV_DIR  = os.path.join(PARENT_DIR, "stimuli", "sequences","combined_wav")
 
+# Syllable samples, read once at import (also in each Pool worker)
+SYLL_CACHE = load_syllable_cache(SYLLABLES_PATH)
+
 def main():
     grammars = ['ADR','HDR']
     lengths = ['short','long']
     violation_types = ['replacement','concatenation']
 
-    # 先处理 grammatical
-    for g in grammars:
-        for l in lengths:
-            csv_filename = f"{g}_grammatical_{l}.csv"
-            csv_path = os.path.join(SEQUENCES_CSV_DIR, csv_filename)
-            # 输出文件夹: stimuli/combined_wav/ e.g. "ADR_short_grammatical"
-            out_subdir = os.path.join(COMBINED_WAV_DIR, f"{g}_{l}_grammatical")
-            # 调用函数
-            process_csv_file(csv_path, out_subdir, limit_count=None)
-
-    # 再处理 ungrammatical
-    for g in grammars:
-        for l in lengths:
-            for vtype in violation_types:
-                csv_filename = f"{g}_{vtype}_{l}.csv"
+    # One worker pool for all 12 CSVs (workers load SYLL_CACHE once on import)
+    with Pool(os.cpu_count()) as pool:
+        # 先处理 grammatical
+        for g in grammars:
+            for l in lengths:
+                csv_filename = f"{g}_grammatical_{l}.csv"
                 csv_path = os.path.join(SEQUENCES_CSV_DIR, csv_filename)
-                # 输出文件夹: e.g. stimuli/combined_wav/ADR_short_replacement
-                out_subdir = os.path.join(COMBINED_WAV_DIR, f"{g}_{l}_{vtype}")
-                process_csv_file(csv_path, out_subdir, limit_count=None)
+                # 输出文件夹: stimuli/combined_wav/ e.g. "ADR_short_grammatical"
+                out_subdir = os.path.join(COMBINED_WAV_DIR, f"{g}_{l}_grammatical")
+                # 调用函数
+                process_csv_file(csv_path, out_subdir, pool, limit_count=None)
+
+        # 再处理 ungrammatical
+        for g in grammars:
+            for l in lengths:
+                for vtype in violation_types:
+                    csv_filename = f"{g}_{vtype}_{l}.csv"
+                    csv_path = os.path.join(SEQUENCES_CSV_DIR, csv_filename)
+                    # 输出文件夹: e.g. stimuli/combined_wav/ADR_short_replacement
+                    out_subdir = os.path.join(COMBINED_WAV_DIR, f"{g}_{l}_{vtype}")
+                    process_csv_file(csv_path, out_subdir, pool, limit_count=None)
 
 if __name__=="__main__":
     main()
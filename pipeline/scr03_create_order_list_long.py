@@ -40,7 +40,6 @@ Where 'condition' might be 'short_gram', 'short_replacement', etc.
 """
 
 import os
-import csv
 import random
 
 # ========================== CONFIG ==========================
@@ -88,96 +87,94 @@ def get_wav_list(folder_path):
     if not os.path.isdir(folder_path):
         print(f"[Warning] Folder not found: {folder_path}")
         return []
-    all_files = os.listdir(folder_path)
-    wavs = [f for f in all_files if f.lower().endswith(".wav")]
+    with os.scandir(folder_path) as entries:
+        wavs = [e.name for e in entries if e.name.lower().endswith(".wav") and e.is_file()]
     return wavs
 
-def save_csv(rows, out_file):
+def save_csv(session_list, out_file):
     """
     Writes a CSV with columns: trial_index, audio_filename, condition
+    session_list: list of (audio_filename, condition); trial_index counts from 1
     """
-    fieldnames = ["trial_index","audio_filename","condition"]
-    with open(out_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+    # Every field is an int or a generated filename/label with no commas or
+    # quotes, so rows are formatted directly (same "\r\n" endings as csv.writer)
+    header = "trial_index,audio_filename,condition\r\n"
+    with open(out_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(header)
+        f.write("".join(f"{i},{fname},{cond}\r\n" for i, (fname, cond) in enumerate(session_list, start=1)))
 
 def main():
+    # Build each folder's trial entries once: (relpath, cond_label).
+    # They are identical for every order; only the random selection and
+    # shuffles below depend on the order's seed.
+    pools = {}
+    for g in GRAMMARS:
+        for length in LENGTHS:
+            for cat in CATEGORIES:
+                # subfolder name, e.g. "ADR_short_concatenation"
+                folder_name = f"{g}_{length}_{cat}"
+                wav_files = get_wav_list(os.path.join(STIM_ROOT, folder_name))
+
+                # Build condition label, e.g. "short_grammatical" or "long_concatenation"
+                cond_label = f"{length}_{cat}"
+
+                # Store "folder_name/filename.wav" in 'audio_filename' so later scripts
+                # can find the subfolder (always joined with a forward slash).
+                pools[(g, length, cat)] = [
+                    (f"{folder_name}/{f}", cond_label)
+                    for f in wav_files
+                ]
+
     # For each grammar, produce 20 order CSV sets
     for grammar in GRAMMARS:
+        # Which folders contribute, and how many trials each, is the same for
+        # every order: check it once => [(pool, needed_total, half), ...]
+        plan = []
+        for length in LENGTHS:
+            for cat in CATEGORIES:
+                # subfolder name, e.g. "ADR_short_concatenation"
+                folder_name = f"{grammar}_{length}_{cat}"
+                pool = pools[(grammar, length, cat)]
+                needed_total = NEEDED_TOTAL.get((length, cat), 0)
+
+                if not pool or needed_total == 0:
+                    # skip if none or not needed
+                    continue
+
+                if len(pool) < needed_total:
+                    print(f"[Error] {folder_name} has {len(pool)} wavs, need {needed_total}. Skipping.")
+                    continue
+
+                # Now split half for session1, half for session2
+                plan.append((pool, needed_total, needed_total // 2))
+
+        # Session sizes are therefore known up front
+        n_session1 = sum(half for _, _, half in plan)
+        n_session2 = sum(needed_total - half for _, needed_total, half in plan)
+
         for order_idx in range(1, N_ORDERS+1):
-            # Set random seed => reproducible
+            # Seed a per-order generator => reproducible
             seed_val = sum(ord(ch) for ch in grammar) + 1000*order_idx
-            random.seed(seed_val)
+            rng = random.Random(seed_val)  # per-order generator; global random state untouched
 
             # We'll store session1 & session2 items in lists: (audio_path, condition)
-            session1_list = []
-            session2_list = []
-
-            # Iterate over each (length, category) pair
-            for length in LENGTHS:
-                for cat in CATEGORIES:
-                    # subfolder name, e.g. "ADR_short_concatenation"
-                    folder_name = f"{grammar}_{length}_{cat}"
-                    folder_path = os.path.join(STIM_ROOT, folder_name)
-
-                    # Gather all .wav (filenames)
-                    wav_files = get_wav_list(folder_path)
-                    needed_total = NEEDED_TOTAL.get((length, cat), 0)
-
-                    if not wav_files or needed_total == 0:
-                        # skip if none or not needed
-                        continue
-
-                    if len(wav_files) < needed_total:
-                        print(f"[Error] {folder_name} has {len(wav_files)} wavs, need {needed_total}. Skipping.")
-                        continue
-
-                    # Shuffle full list, pick needed_total
-                    random.shuffle(wav_files)
-                    subset = wav_files[:needed_total]
-
-                    # Now split half for session1, half for session2
-                    half = needed_total // 2
-                    session1_files = subset[:half]
-                    session2_files = subset[half:]
-
-                    # Build condition label, e.g. "short_gram" or "long_concatenation"
-                    cond_label = f"{length}_{cat}"
-
-                    # The key difference: store "folder_name/filename.wav" in 'audio_filename'
-                    # so scripts can find them in subsequent steps
-                    # We can use forward slash to unify:
-                    session1_relpaths = [os.path.join(folder_name, f).replace("\\","/") for f in session1_files]
-                    session2_relpaths = [os.path.join(folder_name, f).replace("\\","/") for f in session2_files]
-
-                    # Add them to session lists
-                    session1_list.extend((rp, cond_label) for rp in session1_relpaths)
-                    session2_list.extend((rp, cond_label) for rp in session2_relpaths)
+            session1_list = [None] * n_session1
+            session2_list = [None] * n_session2
+
+            # Fill the preallocated lists slice by slice, in (length, category) order
+            pos1 = pos2 = 0
+            for pool, needed_total, half in plan:
+                # Randomly pick needed_total entries (the cached pool itself is left untouched)
+                subset = rng.sample(pool, needed_total)
+
+                session1_list[pos1:pos1 + half] = subset[:half]
+                session2_list[pos2:pos2 + needed_total - half] = subset[half:]
+                pos1 += half
+                pos2 += needed_total - half
 
             # Shuffle final pool for each session
-            random.shuffle(session1_list)
-            random.shuffle(session2_list)
-
-            # Build row dicts for CSV
-            session1_rows = []
-            for i, (fname, cond) in enumerate(session1_list, start=1):
-                row = {
-                    "trial_index": i,
-                    "audio_filename": fname,  # e.g. "ADR_short_concatenation/A1_e_b.wav"
-                    "condition": cond
-                }
-                session1_rows.append(row)
-
-            session2_rows = []
-            for i, (fname, cond) in enumerate(session2_list, start=1):
-                row = {
-                    "trial_index": i,
-                    "audio_filename": fname,
-                    "condition": cond
-                }
-                session2_rows.append(row)
+            rng.shuffle(session1_list)
+            rng.shuffle(session2_list)
 
             # Save CSV, e.g. "ADR_order1_session1.csv"
             out_filename_1 = f"{grammar}_order{order_idx}_session1.csv"
@@ -185,11 +182,11 @@ def main():
             out_path_1 = os.path.join(OUTPUT_DIR, out_filename_1)
             out_path_2 = os.path.join(OUTPUT_DIR, out_filename_2)
 
-            save_csv(session1_rows, out_path_1)
-            save_csv(session2_rows, out_path_2)
+            save_csv(session1_list, out_path_1)
+            save_csv(session2_list, out_path_2)
 
-            print(f"[Info] Created {out_filename_1} ({len(session1_rows)} lines), "
-                  f"{out_filename_2} ({len(session2_rows)} lines).")
+            print(f"[Info] Created {out_filename_1} ({len(session1_list)} lines), "
+                  f"{out_filename_2} ({len(session2_list)} lines).")
 
 
 if __name__ == "__main__":
@@ -29,8 +29,13 @@ The resulting CSV columns now are:
 
 import os
 import csv
+import argparse
+import logging
 import random
 
+# Per-row debug output; %-style arguments are only formatted when DEBUG is enabled
+logger = logging.getLogger(__name__)
+
 # ========================== CONFIG ==========================
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PARENT_DIR = os.path.dirname(SCRIPT_DIR)
@@ -75,8 +80,8 @@ def get_wav_list(folder_path):
     if not os.path.isdir(folder_path):
         print(f"[Warning] Folder not found: {folder_path}")
         return []
-    all_files = os.listdir(folder_path)
-    wavs = [f for f in all_files if f.lower().endswith(".wav")]
+    with os.scandir(folder_path) as entries:
+        wavs = [e.name for e in entries if e.name.lower().endswith(".wav") and e.is_file()]
     return wavs
 
 
@@ -118,7 +123,7 @@ def load_position_dict(grammar, length, category):
         # 我们简单地取 syll_i 列为 headers[2 : pos_idx]
         for row in reader:
             if len(row) < (pos_idx+1):
-                print(f"[Debug] Skipped row because len(row)={len(row)}, pos_idx+1={pos_idx+1}")
+                logger.debug("Skipped row because len(row)=%d, pos_idx+1=%d", len(row), pos_idx+1)
                 continue
             position_str = row[pos_idx].strip()
             # print(f"[Debug] read position='{position_str}' from row={row}")
@@ -140,128 +145,117 @@ def load_position_dict(grammar, length, category):
     return pos_dict
 
 
-def save_csv(rows, out_file):
+def save_csv(session_list, out_file):
     """
     Writes a CSV with columns: trial_index, audio_filename, condition, position
+    session_list: list of (audio_filename, condition, position); trial_index counts from 1
     """
-    fieldnames = ["trial_index", "audio_filename", "condition", "position"]
-    with open(out_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+    # Every field is an int or a generated filename/label with no commas or
+    # quotes, so rows are formatted directly (same "\r\n" endings as csv.writer)
+    header = "trial_index,audio_filename,condition,position\r\n"
+    with open(out_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(header)
+        f.write("".join(f"{i},{fname},{cond},{pos}\r\n" for i, (fname, cond, pos) in enumerate(session_list, start=1)))
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print per-row [Debug] messages")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="[Debug] %(message)s")
+
+    # Build each folder's trial entries once: (relpath, cond_label, position).
+    # They are identical for every order; only the random selection and
+    # shuffles below depend on the order's seed.
+    pools = {}
+    for g in GRAMMARS:
+        for length in LENGTHS:
+            for cat in CATEGORIES:
+                # subfolder name, e.g. "ADR_short_concatenation"
+                folder_name = f"{g}_{length}_{cat}"
+                wav_files = get_wav_list(os.path.join(STIM_ROOT, folder_name))
+
+                # 加载该 folder 对应的 position 字典 (纯文件名 -> position)
+                pos_dict = load_position_dict(g, length, cat)
+
+                # Build condition label, e.g. "short_grammatical" or "long_concatenation"
+                cond_label = f"{length}_{cat}"
+
+                # Store "folder_name/filename.wav" in 'audio_filename' so later scripts
+                # can find the subfolder (always joined with a forward slash).
+                pool = []
+                for f in wav_files:
+                    relpath = f"{folder_name}/{f}"
+                    position_val = pos_dict.get(f, 0)  # 默认 0
+                    pool.append((relpath, cond_label, position_val))
+                pools[(g, length, cat)] = pool
+
     # For each grammar, produce 20 order CSV sets
     for grammar in GRAMMARS:
+        # Which folders contribute, and how many trials each, is the same for
+        # every order: check it once => [(pool, needed_total, half), ...]
+        plan = []
+        for length in LENGTHS:
+            for cat in CATEGORIES:
+                # subfolder name, e.g. "ADR_short_concatenation"
+                folder_name = f"{grammar}_{length}_{cat}"
+                pool = pools[(grammar, length, cat)]
+                needed_total = NEEDED_TOTAL.get((length, cat), 0)
+
+                if not pool or needed_total == 0:
+                    # skip if none or not needed
+                    continue
+
+                if len(pool) < needed_total:
+                    print(f"[Error] {folder_name} has {len(pool)} wavs, need {needed_total}. Skipping.")
+                    continue
+
+                # Now split half for session1, half for session2
+                plan.append((pool, needed_total, needed_total // 2))
+
+        # Session sizes are therefore known up front
+        n_session1 = sum(half for _, _, half in plan)
+        n_session2 = sum(needed_total - half for _, needed_total, half in plan)
+
         for order_idx in range(1, N_ORDERS+1):
-            # Set random seed => reproducible shuffle
+            # Seed a per-order generator => reproducible shuffle
             seed_val = sum(ord(ch) for ch in grammar) + 1000*order_idx
-            random.seed(seed_val)
-
-            session1_list = []
-            session2_list = []
-
-            # For each (length, category)
-            for length in LENGTHS:
-                for cat in CATEGORIES:
-                    # subfolder name, e.g. "ADR_short_concatenation"
-                    folder_name = f"{grammar}_{length}_{cat}"
-                    folder_path = os.path.join(STIM_ROOT, folder_name)
-
-                    # 1) 加载该 folder 对应的 position 字典
-                    pos_dict = load_position_dict(grammar, length, cat)
-
-                    # 2) 获取该文件夹内所有 wav 文件
-                    wav_files = get_wav_list(folder_path)
-                    needed_total = NEEDED_TOTAL.get((length, cat), 0)
-
-                    if not wav_files or needed_total == 0:
-                        # skip if none or not needed
-                        continue
-
-                    if len(wav_files) < needed_total:
-                        print(f"[Error] {folder_name} has {len(wav_files)} wavs, need {needed_total}. Skipping.")
-                        continue
-
-                    # Shuffle full list, pick needed_total
-                    random.shuffle(wav_files)
-                    subset = wav_files[:needed_total]
-
-                    # 在理想情况下，应该拆分一半给 session1，一半给 session2
-                    # 但脚本目前只处理 session1。此处先保留原逻辑：
-                    half = needed_total // 2
-                    session1_files = subset[:half]
-                    session2_files = subset[half:]  # 如果需要 session2，可启用
-
-                    # Build condition label, e.g. "short_grammatical"
-                    cond_label = f"{length}_{cat}"
-
-                    # 相对路径: "ADR_short_concatenation/A1_e_b.wav"
-                    session1_relpaths = [
-                        os.path.join(folder_name, f).replace("\\", "/")
-                        for f in session1_files
-                    ]
-
-                    # 填入 session1_list
-                    for rp in session1_relpaths:
-                        # 注意：pos_dict 存储的是纯文件名 -> position
-                        # 这里 rp 是带有子文件夹的相对路径
-                        # 我们先把纯文件名取出来，在字典里查 position
-                        filename_only = os.path.basename(rp)
-                        position_val = pos_dict.get(filename_only, 0)  # 默认 0
-                        session1_list.append((rp, cond_label, position_val))
-
-                    # 如果要给 session2 分配，可自行在此添加类似逻辑：
-                    session2_relpaths = [
-                        os.path.join(folder_name, f).replace("\\", "/")
-                        for f in session2_files
-                    ]
-                    for rp in session2_relpaths:
-                        filename_only = os.path.basename(rp)
-                        position_val = pos_dict.get(filename_only, 0)
-                        session2_list.append((rp, cond_label, position_val))
+            rng = random.Random(seed_val)  # per-order generator; global random state untouched
+
+            session1_list = [None] * n_session1
+            session2_list = [None] * n_session2
+
+            # Fill the preallocated lists slice by slice, in (length, category) order
+            pos1 = pos2 = 0
+            for pool, needed_total, half in plan:
+                # Randomly pick needed_total entries (the cached pool itself is left untouched)
+                subset = rng.sample(pool, needed_total)
+
+                session1_list[pos1:pos1 + half] = subset[:half]
+                session2_list[pos2:pos2 + needed_total - half] = subset[half:]
+                pos1 += half
+                pos2 += needed_total - half
 
             # Shuffle final pool for session1 (and session2 if needed)
-            random.shuffle(session1_list)
-            random.shuffle(session2_list)
-
-            # Build row dicts for CSV
-            session1_rows = []
-            for i, (fname, cond, pos) in enumerate(session1_list, start=1):
-                 # 在这儿打印一下
-                print(f"[Debug] final (fname={fname}, cond={cond}, pos={pos})")
-                row = {
-                    "trial_index": i,
-                    "audio_filename": fname,  # e.g. "ADR_short_concatenation/A1_e_b.wav"
-                    "condition": cond,
-                    "position": pos
-                }
-                session1_rows.append(row)
-
-            # 如果需要 session2_rows:
-            session2_rows = []
-            for i, (fname, cond, pos) in enumerate(session2_list, start=1):
-                row = {
-                    "trial_index": i,
-                    "audio_filename": fname,
-                    "condition": cond,
-                    "position": pos
-                }
-                session2_rows.append(row)
+            rng.shuffle(session1_list)
+            rng.shuffle(session2_list)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                for fname, cond, pos in session1_list:
+                    logger.debug("final (fname=%s, cond=%s, pos=%s)", fname, cond, pos)
 
             # Save CSV for session1
             out_filename_1 = f"{grammar}_order{order_idx}_session1.csv"
             out_path_1 = os.path.join(OUTPUT_DIR, out_filename_1)
-            save_csv(session1_rows, out_path_1)
-            print(f"[Info] Created {out_filename_1} ({len(session1_rows)} lines)")
+            save_csv(session1_list, out_path_1)
+            print(f"[Info] Created {out_filename_1} ({len(session1_list)} lines)")
 
             # If needed, also save session2
             out_filename_2 = f"{grammar}_order{order_idx}_session2.csv"
             out_path_2 = os.path.join(OUTPUT_DIR, out_filename_2)
-            save_csv(session2_rows, out_path_2)
-            print(f"[Info] Created {out_filename_2} ({len(session2_rows)} lines)")
+            save_csv(session2_list, out_path_2)
+            print(f"[Info] Created {out_filename_2} ({len(session2_list)} lines)")
 
 
 if __name__ == "__main__":
@@ -35,6 +35,10 @@ COL4 = " 4.0"
 COL5 = " 0.05"
 EMPTY_COLS = 3  # number of empty columns
 
+# Everything before {wav_file} is the same on every line, so join it once:
+#   " ,  ,  ,  4.0,  0.05, , , , "
+LINE_PREFIX = ", ".join([COL2, COL2, COL3, COL4, COL5] + [""] * EMPTY_COLS) + ", "
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--input-dir", "-i", required=True, help="Folder containing the CSV files from create_order.py")
@@ -53,11 +57,12 @@ def main():
     # e.g. ADR_order6_session1.csv => order=6, session=1
     pattern = re.compile(r"^[A-Za-z]+_order(\d+)_session(\d+)\.csv$")
 
-    all_files = os.listdir(input_dir)
-    csv_files = [f for f in all_files if f.lower().endswith(".csv")]
+    # One scandir pass; the regex already requires the ".csv" suffix
+    with os.scandir(input_dir) as entries:
+        csv_files = [e.name for e in entries if e.is_file()]
 
     for csv_filename in csv_files:
-        match = pattern.match(csv_filename)
+        match = pattern.fullmatch(csv_filename)
         if not match:
             # skip files that don't match the naming pattern
             continue
@@ -80,26 +85,28 @@ def convert_csv_to_order_file(csv_path, txt_path):
     Read CSV with a 'audio_filename' column, produce lines in the final .txt:
       _audio_{base}.png, 1.0, 1.0, 5, 0.05, , , , {wav_file}
     """
-    with open(csv_path, 'r', encoding='utf-8') as f_in, open(txt_path, 'w', encoding='utf-8') as f_out:
-        reader = csv.DictReader(f_in)
+    # Collect all output lines first and write them in one go at the end
+    lines = []
+    with open(csv_path, 'r', encoding='utf-8') as f_in:
+        reader = csv.reader(f_in)
+        headers = next(reader, [])
+
+        # Without an 'audio_filename' column the output file stays empty
+        wav_idx = headers.index("audio_filename") if "audio_filename" in headers else None
 
         for row in reader:
-            wav_file = row.get("audio_filename","").strip()
+            if wav_idx is None or wav_idx >= len(row):
+                continue
+            wav_file = row[wav_idx].strip()
             if not wav_file:
                 continue
-            
-            base_name, ext = os.path.splitext(wav_file)
-            # Build columns
-            # e.g. [f"_audio_{base_name}.png", "1.0", "1.0", "5", "0.05", "", "", "", wav_file]
-            # then join with ", "
-            # columns = [f"_audio_{base_name}.png", COL2, COL3, COL4, COL5]
-            columns = [COL2, COL2, COL3, COL4, COL5]
-            # add empty columns
-            for _ in range(EMPTY_COLS):
-                columns.append("")
-            columns.append(wav_file)
-            line_str = ", ".join(columns)
-            f_out.write(line_str + "\n")
+
+            # Columns: [COL2, COL2, COL3, COL4, COL5, "", "", "", wav_file] joined with ", "
+            lines.append(LINE_PREFIX + wav_file)
+
+    with open(txt_path, 'w', encoding='utf-8', buffering=1 << 20) as f_out:
+        if lines:
+            f_out.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,22 @@
+import numpy as np
+import soundfile as sf
+
+# ✅ 轻量读写工具：只依赖 soundfile / NumPy，不引入 noisereduce、pyloudnorm 等重模块
+#    裁剪脚本的子进程 (spawn) 会重新导入本模块，保持导入开销小
+
+# ✅ 读取：soundfile 直接解码为 float32，多声道取平均 (与 librosa.load(sr=None) 结果一致)
+def load_mono(filepath):
+    y, sr = sf.read(filepath, dtype='float32', always_2d=False)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    return y, sr
+
+# ✅ 每个工作进程复用缓冲区 (按形状缓存)，避免每个文件都重新分配
+#    返回的内容是上一个文件留下的，调用方负责把每个位置都写一遍 (含补零部分)
+_scratch_buffers = {}
+
+def scratch_buffer(shape):
+    buf = _scratch_buffers.get(shape)
+    if buf is None:
+        buf = _scratch_buffers[shape] = np.empty(shape, dtype=np.float32)
+    return buf
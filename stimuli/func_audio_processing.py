@@ -1,82 +1,180 @@
 import os
-import librosa
+from math import gcd
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+import numpy as np
 import soundfile as sf
 import noisereduce as nr
 import pyloudnorm as pyln
 import scipy.signal
 
+# 读取为 float32 单声道；之后每一步的输出都保持 float32，写出时仍由 soundfile 转为默认的 PCM_16
+from func_audio_io import load_mono
+
+# ✅ 并行批处理：每个文件互不依赖，分发到多个进程
+#    调用这些函数的脚本需要放在 `if __name__ == "__main__":` 下 (spawn 启动方式)
+def _run_batch(worker, input_folder, output_folder, **kwargs):
+    """ 对 input_folder 中所有 .wav 并行调用 worker(file, input_folder, output_folder, **kwargs) """
+    os.makedirs(output_folder, exist_ok=True)
+
+    with os.scandir(input_folder) as entries:
+        files = [e.name for e in entries if e.name.endswith('.wav')]
+    job = partial(worker, input_folder=input_folder, output_folder=output_folder, **kwargs)
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for message in executor.map(job, files):
+            print(message)
+
 # ✅ LUFS 归一化
-def normalize_lufs(input_folder, output_folder, target_lufs=-23):
-    """ 统一音频强度到目标 LUFS (-23 LUFS by default) """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+@lru_cache(maxsize=16)
+def _meter(sr):
+    """ 每个采样率只构建一次 K-weighting 滤波器；Meter 测量时不保存状态，可复用 """
+    return pyln.Meter(sr)
 
-    for file in os.listdir(input_folder):
-        if file.endswith('.wav'):
-            filepath = os.path.join(input_folder, file)
-            y, sr = librosa.load(filepath, sr=None)
+def _normalize_lufs_one(file, input_folder, output_folder, target_lufs):
+    filepath = os.path.join(input_folder, file)
+    y, sr = load_mono(filepath)
 
-            meter = pyln.Meter(sr)
-            loudness = meter.integrated_loudness(y)
+    meter = _meter(sr)
+    loudness = meter.integrated_loudness(y)
 
-            # 计算增益调整
-            y_normalized = pyln.normalize.loudness(y, loudness, target_lufs)
+    # 计算增益调整
+    y_normalized = pyln.normalize.loudness(y, loudness, target_lufs).astype(np.float32, copy=False)
 
-            output_path = os.path.join(output_folder, file)
-            sf.write(output_path, y_normalized, sr)
-            print(f"✅ LUFS 归一化: {file} -> {output_path}")
+    output_path = os.path.join(output_folder, file)
+    sf.write(output_path, y_normalized, sr)
+    return f"✅ LUFS 归一化: {file} -> {output_path}"
+
+def normalize_lufs(input_folder, output_folder, target_lufs=-23):
+    """ 统一音频强度到目标 LUFS (-23 LUFS by default) """
+    _run_batch(_normalize_lufs_one, input_folder, output_folder, target_lufs=target_lufs)
+
+# ✅ 按 (sr, 长度) 分组：长度和采样率相同的文件 (裁剪后的 syllable 都一样长)
+#    可以叠成一个 (n_files, n_samples) 批次，一次调用处理整批
+#    主进程只读文件头分组，每组再按进程数切块，由各子进程自己解码，避免整组落在一个进程上
+def _scan_groups(input_folder, n_chunks):
+    """ 返回 [(sr, files), ...]，同一块内文件的 sr 和长度相同，每组最多切成 n_chunks 块 """
+    groups = {}
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.wav'):
+                info = sf.info(entry.path)  # 只读文件头，不解码
+                groups.setdefault((info.samplerate, info.frames), []).append(entry.name)
+
+    chunks = []
+    for (sr, _), files in groups.items():
+        size = -(-len(files) // n_chunks)  # 向上取整
+        chunks.extend((sr, files[i:i + size]) for i in range(0, len(files), size))
+    return chunks
+
+def _run_group_chunk(chunk, worker, input_folder, output_folder, **kwargs):
+    """ 子进程内：读入本块文件，叠成 (sr, files, ys) 交给 worker """
+    sr, files = chunk
+    ys = [load_mono(os.path.join(input_folder, file))[0] for file in files]
+    return worker((sr, files, ys), output_folder, **kwargs)
+
+def _run_groups(worker, input_folder, output_folder, **kwargs):
+    """ 每块调用一次 worker(group, output_folder, **kwargs)，各块分发到多个进程 """
+    os.makedirs(output_folder, exist_ok=True)
+
+    n_workers = os.cpu_count()
+    job = partial(_run_group_chunk, worker=worker, input_folder=input_folder,
+                  output_folder=output_folder, **kwargs)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for messages in executor.map(job, _scan_groups(input_folder, n_workers)):
+            for message in messages:
+                print(message)
 
 # ✅ 降噪
+#    每块一次调用 reduce_noise (各行分别估计噪声，切块不影响结果)；不做补零，避免改变噪声估计
+def _denoise_group(group, output_folder):
+    sr, files, ys = group
+    y_denoised = nr.reduce_noise(y=np.stack(ys), sr=sr, prop_decrease=0.8).astype(np.float32, copy=False)
+
+    messages = []
+    pjoin = os.path.join  # 循环内少一次属性查找
+    for file, y_row in zip(files, y_denoised):
+        output_path = pjoin(output_folder, file)
+        sf.write(output_path, y_row, sr)
+        messages.append(f"✅ 降噪处理: {file} -> {output_path}")
+    return messages
+
 def denoise_audio(input_folder, output_folder):
     """ 对音频进行降噪处理 """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    for file in os.listdir(input_folder):
-        if file.endswith('.wav'):
-            filepath = os.path.join(input_folder, file)
-            y, sr = librosa.load(filepath, sr=None)
-
-            # 降噪
-            y_denoised = nr.reduce_noise(y=y, sr=sr, prop_decrease=0.8)
-
-            output_path = os.path.join(output_folder, file)
-            sf.write(output_path, y_denoised, sr)
-            print(f"✅ 降噪处理: {file} -> {output_path}")
+    _run_groups(_denoise_group, input_folder, output_folder)
 
 # ✅ 采样率统一
+def _resample(y, sr, target_sr):
+    """
+    多相 FIR 重采样 (沿最后一维，单个文件或整组 (n_files, n_samples) 都可以)：
+    采样率都是整数，up/down 为约分后的整数比 (如 44100 -> 48000 为 160/147)
+    """
+    if sr == target_sr:
+        return y
+    g = gcd(sr, target_sr)
+    return scipy.signal.resample_poly(y, target_sr // g, sr // g, axis=-1).astype(np.float32, copy=False)
+
+def _resample_group(group, output_folder, target_sr):
+    sr, files, ys = group
+
+    # 每块一次重新采样，滤波器每块只设计一次 (resample_poly 逐行独立，切块不影响结果)
+    y_resampled = _resample(np.stack(ys), sr, target_sr)
+
+    messages = []
+    pjoin = os.path.join  # 循环内少一次属性查找
+    for file, y_row in zip(files, y_resampled):
+        output_path = pjoin(output_folder, file)
+        sf.write(output_path, y_row, target_sr)
+        messages.append(f"✅ 采样率调整: {file} -> {output_path} ({target_sr} Hz)")
+    return messages
+
 def resample_audio(input_folder, output_folder, target_sr=48000):
     """ 统一音频采样率，默认 48000 Hz """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    _run_groups(_resample_group, input_folder, output_folder, target_sr=target_sr)
+
+# ✅ 频谱平滑
+@lru_cache(maxsize=8)
+def _lowpass_sos(sr, cutoff_freq):
+    """ 10 阶 Butterworth 低通 (SOS)，系数只取决于 (sr, cutoff_freq)，每个进程只设计一次 """
+    return scipy.signal.butter(10, cutoff_freq, 'low', fs=sr, output='sos')
 
-    for file in os.listdir(input_folder):
-        if file.endswith('.wav'):
-            filepath = os.path.join(input_folder, file)
-            y, sr = librosa.load(filepath, sr=None)
+def _smooth_spectrum_one(file, input_folder, output_folder, cutoff_freq):
+    filepath = os.path.join(input_folder, file)
+    y, sr = load_mono(filepath)
 
-            # 重新采样
-            y_resampled = librosa.resample(y, orig_sr=sr, target_sr=target_sr)
+    # 低通滤波器 (按采样率缓存)
+    sos = _lowpass_sos(sr, cutoff_freq)
+    y_smoothed = scipy.signal.sosfilt(sos, y).astype(np.float32, copy=False)
 
-            output_path = os.path.join(output_folder, file)
-            sf.write(output_path, y_resampled, target_sr)
-            print(f"✅ 采样率调整: {file} -> {output_path} ({target_sr} Hz)")
+    output_path = os.path.join(output_folder, file)
+    sf.write(output_path, y_smoothed, sr)
+    return f"✅ 频谱平滑: {file} -> {output_path} (Cutoff: {cutoff_freq} Hz)"
 
-# ✅ 频谱平滑
 def smooth_spectrum(input_folder, output_folder, cutoff_freq=8000):
     """ 频谱平滑：低通滤波 (默认 8000 Hz) """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    for file in os.listdir(input_folder):
-        if file.endswith('.wav'):
-            filepath = os.path.join(input_folder, file)
-            y, sr = librosa.load(filepath, sr=None)
-
-            # 设计低通滤波器
-            sos = scipy.signal.butter(10, cutoff_freq, 'low', fs=sr, output='sos')
-            y_smoothed = scipy.signal.sosfilt(sos, y)
-
-            output_path = os.path.join(output_folder, file)
-            sf.write(output_path, y_smoothed, sr)
-            print(f"✅ 频谱平滑: {file} -> {output_path} (Cutoff: {cutoff_freq} Hz)")
+    _run_batch(_smooth_spectrum_one, input_folder, output_folder, cutoff_freq=cutoff_freq)
+
+# ✅ 一次性完整处理：LUFS 归一化 -> 降噪 -> 重采样 -> 低通滤波
+#    每个文件只读写一次 (等价于依次运行 scr03 ~ scr06，但省去中间文件)
+def _process_full_one(file, input_folder, output_folder, target_lufs, target_sr, sos):
+    filepath = os.path.join(input_folder, file)
+    y, sr = load_mono(filepath)
+
+    # 全程保持 float32 (读入即为 float32)，避免中间步骤升为 float64
+    meter = _meter(sr)
+    y = pyln.normalize.loudness(y, meter.integrated_loudness(y), target_lufs).astype(np.float32, copy=False)
+    y = nr.reduce_noise(y=y, sr=sr, prop_decrease=0.8).astype(np.float32, copy=False)
+    y = _resample(y, sr, target_sr)
+    y = scipy.signal.sosfilt(sos, y).astype(np.float32, copy=False)
+
+    output_path = os.path.join(output_folder, file)
+    sf.write(output_path, y, target_sr)
+    return f"✅ 完整处理: {file} -> {output_path}"
+
+def process_audio_full(input_folder, output_folder, target_lufs=-23, target_sr=48000, cutoff_freq=8000):
+    """ LUFS 归一化 + 降噪 + 重采样 + 频谱平滑，一次读入、一次写出 """
+    # 重采样后采样率固定为 target_sr，滤波器只需设计一次
+    sos = _lowpass_sos(target_sr, cutoff_freq)
+    _run_batch(_process_full_one, input_folder, output_folder,
+               target_lufs=target_lufs, target_sr=target_sr, sos=sos)
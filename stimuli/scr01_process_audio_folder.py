@@ -1,8 +1,25 @@
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
-import librosa
-import librosa.display
 import soundfile as sf
+from func_audio_io import load_mono, scratch_buffer
+
+# ✅ 短时 RMS：帧参数与 librosa.feature.rms 默认值一致
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+def frame_power(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """
+    纯 NumPy 计算短时均方能量 (RMS 的平方)，与 librosa.feature.rms 分帧方式一致
+    - center=True：两端各补 frame_length // 2 个零
+    - 分帧用 sliding_window_view (只是视图，不复制数据)，einsum 逐帧求平方和
+    """
+    y_padded = np.pad(y, frame_length // 2)
+    frames = np.lib.stride_tricks.sliding_window_view(y_padded, frame_length)[::hop_length]
+    return np.einsum('ij,ij->i', frames, frames) / frame_length
 
 def find_high_energy_onset(y, sr, threshold_ratio=0.4):
     """
@@ -10,73 +27,99 @@ def find_high_energy_onset(y, sr, threshold_ratio=0.4):
     - 计算短时 RMS 能量
     - 选择高于最大能量 * threshold_ratio（默认 40%）的第一个点作为起点
     """
-    rms = librosa.feature.rms(y=y)[0]  # 计算 RMS 能量
-    max_rms = np.max(rms)  # 找到最大能量
-    onset_frame = np.argmax(rms > max_rms * threshold_ratio)  # 找到第一个超过阈值的帧
-    onset_time = librosa.frames_to_time(onset_frame, sr=sr)  # 转换为时间
+    # rms > max_rms * ratio  <=>  power > max_power * ratio**2 (都非负)，省去逐帧开方
+    power = frame_power(y)  # 计算均方能量
+    # 前缀最大值单调不减：最后一项就是最大能量，第一个超过阈值的帧可以二分查找，
+    # 不再需要单独求 max 和逐帧比较生成的布尔数组
+    running_max = np.maximum.accumulate(power)
+    max_power = running_max[-1]  # 找到最大能量
+    onset_frame = int(np.searchsorted(running_max, max_power * threshold_ratio ** 2, side='right'))  # 找到第一个超过阈值的帧
+    if onset_frame == len(running_max):
+        onset_frame = 0  # 没有帧超过阈值 (如全静音)：与 argmax(全 False) 一样取第 0 帧
+    onset_time = onset_frame * HOP_LENGTH / sr  # 转换为时间 (等价于 librosa.frames_to_time)
     return onset_time
 
+# ✅ 每个文件只读取一次：第一遍的波形和主能量起点直接留给第二遍使用
+#    (syllable 很短，在进程间传递波形的开销远小于重复解码)
+def _measure_one(filepath):
+    """ 第一遍：返回 (y, sr, 主能量起点, 实际时长) """
+    y, sr = load_mono(filepath)  # 读取音频
+
+    onset_time = find_high_energy_onset(y, sr)  # 计算主能量起点
+    actual_duration = len(y) / sr  # 获取音频实际长度 (秒)
+    return y, sr, onset_time, actual_duration
+
+def _process_one(record, output_folder, min_onset, final_length):
+    """ 第二遍：按最早主能量起点对齐、裁剪并补齐到 final_length """
+    file, y, sr, onset_time, actual_end_time = record
+
+    onset_sample = int(onset_time * sr)  # 计算主能量起点的采样点
+    start_sample = max(0, onset_sample - int(min_onset * sr))  # 对齐 syllable
+
+    # 计算 syllable 真实结束点，确保不会截断
+    end_sample = int(min(actual_end_time * sr, start_sample + final_length * sr))
+
+    # 裁剪 + 补零一步完成：输出固定为 target_samples 长，拷入实际存在的部分，其余补 0
+    #   (所有 syllable 长度一致，不再需要判断是否补零)
+    target_samples = int(final_length * sr)
+    n = max(0, min(end_sample - start_sample, target_samples, len(y) - start_sample))
+    y_trimmed = scratch_buffer((target_samples,))  # 与读入的 float32 一致
+    y_trimmed[:n] = y[start_sample:start_sample + n]
+    y_trimmed[n:] = 0  # 补零
+
+    # 保存裁剪后的音频
+    output_path = os.path.join(output_folder, file)
+    sf.write(output_path, y_trimmed, sr)
+    return f"处理完成: {file} -> {output_path}"
+
 def process_audio_folder(input_folder, output_folder, target_length=0.6):
     """
     - 使用 RMS 能量对齐 syllable 主能量部分
     - 统一 syllable 长度，确保 ERP 事件时间锁定
     """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    onset_times = []
-    actual_durations = []
-    
-    audio_files = [f for f in os.listdir(input_folder) if f.endswith('.wav')]
-    
-    for file in audio_files:
-        filepath = os.path.join(input_folder, file)
-        y, sr = librosa.load(filepath, sr=None)
-        
-        onset_time = find_high_energy_onset(y, sr)  # 计算主能量起点
-        actual_duration = librosa.get_duration(y=y, sr=sr)  # 获取音频实际长度
-
-        onset_times.append(onset_time)
-        actual_durations.append(actual_duration)
-    
-    # 计算最早的主能量时间点，确保所有 syllable 对齐
-    min_onset = min(onset_times)
-    max_duration = max(actual_durations)
-    final_length = min(target_length, max_duration)
-
-    print(f"最早主能量起点: {min_onset:.3f} 秒, 统一裁剪长度: {final_length:.3f} 秒")
-
-    for file in audio_files:
-        filepath = os.path.join(input_folder, file)
-        y, sr = librosa.load(filepath, sr=None)
-
-        onset_time = find_high_energy_onset(y, sr)
-        onset_sample = int(onset_time * sr)  # 计算主能量起点的采样点
-        start_sample = max(0, onset_sample - int(min_onset * sr))  # 对齐 syllable
-
-        # 计算 syllable 真实结束点，确保不会截断
-        actual_end_time = librosa.get_duration(y=y, sr=sr)
-        end_sample = int(min(actual_end_time * sr, start_sample + final_length * sr))
-
-        y_trimmed = y[start_sample:end_sample]
-
-        # 确保所有 syllable 长度一致
-        if len(y_trimmed) < int(final_length * sr):
-            padding = int(final_length * sr) - len(y_trimmed)
-            y_trimmed = np.pad(y_trimmed, (0, padding), mode='constant')
-
-        # 保存裁剪后的音频
-        output_path = os.path.join(output_folder, file)
-        sf.write(output_path, y_trimmed, sr)
-        print(f"处理完成: {file} -> {output_path}")
+    os.makedirs(output_folder, exist_ok=True)
+
+    # DirEntry 自带完整路径，不需要再 os.path.join
+    with os.scandir(input_folder) as entries:
+        wav_entries = [e for e in entries if e.name.endswith('.wav')]
+    audio_files = [e.name for e in wav_entries]
+    filepaths = [e.path for e in wav_entries]
+    if not audio_files:
+        print(f"[Warning] 没有找到 .wav 文件: {input_folder}")
+        return
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # records: (file, y, sr, onset_time, actual_duration)
+        # 边收集边更新最早的主能量时间点和最长时长，确保所有 syllable 对齐
+        records = []
+        min_onset = math.inf
+        max_duration = 0.0
+        for file, measure in zip(audio_files, executor.map(_measure_one, filepaths, chunksize=8)):
+            _, _, onset_time, actual_duration = measure
+            records.append((file, *measure))
+            if onset_time < min_onset:
+                min_onset = onset_time
+            if actual_duration > max_duration:
+                max_duration = actual_duration
+
+        final_length = min(target_length, max_duration)
+
+        print(f"最早主能量起点: {min_onset:.3f} 秒, 统一裁剪长度: {final_length:.3f} 秒")
+
+        job = partial(_process_one, output_folder=output_folder,
+                      min_onset=min_onset, final_length=final_length)
+        for message in executor.map(job, records, chunksize=8):
+            print(message)
 
     print("所有音频处理完毕！")
 
-# 示例使用
-current_dir = os.path.dirname(os.path.abspath(__file__))
+# 多进程处理需要 main guard (子进程会重新导入本脚本)
+if __name__ == "__main__":
+    # 示例使用
+    current_dir = os.path.dirname(os.path.abspath(__file__))
 
-input_folder = "raw_syllables"  # 输入文件夹
-input_folder = os.path.join(current_dir, "raw", input_folder)
-output_folder = "processed_syllables"  # 输出文件夹
-output_folder = os.path.join(current_dir, "processed", output_folder)
-process_audio_folder(input_folder, output_folder)
+    input_folder = "raw_syllables"  # 输入文件夹
+    input_folder = os.path.join(current_dir, "raw", input_folder)
+    output_folder = "processed_syllables"  # 输出文件夹
+    output_folder = os.path.join(current_dir, "processed", output_folder)
+    process_audio_folder(input_folder, output_folder)
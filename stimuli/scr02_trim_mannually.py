@@ -1,7 +1,48 @@
 import os
-import numpy as np
-import librosa
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import soundfile as sf
+from func_audio_io import scratch_buffer
+
+# ✅ 读取 + 裁剪 + 补零一步完成：只解码需要的片段 [start_sample, end_sample)，
+#    直接写进 end_sample - start_sample 长的输出数组，不足部分补 0 (所有音频长度一致)
+#    float32，多声道取平均 (与 librosa.load(sr=None) 后再切片、补零的结果一致)
+def _read_segment(filepath, start_time, end_time):
+    """ 返回 (y_segment, sr)，y_segment 长度固定为 end_sample - start_sample """
+    with sf.SoundFile(filepath) as f:
+        sr = f.samplerate
+
+        # 计算裁剪的样本索引
+        start_sample = int(start_time * sr)
+        end_sample = int(end_time * sr)
+        target_length = max(0, end_sample - start_sample)
+        n = max(0, min(target_length, f.frames - start_sample))  # 文件中实际存在的样本数
+
+        y_segment = scratch_buffer((target_length,))
+        if n > 0:
+            f.seek(start_sample)
+            if f.channels == 1:
+                f.read(n, dtype='float32', out=y_segment[:n])  # 单声道：直接解码到输出数组
+            else:
+                frames = scratch_buffer((target_length, f.channels))[:n]
+                f.read(n, dtype='float32', out=frames)
+                frames.mean(axis=1, out=y_segment[:n])
+        y_segment[n:] = 0  # 补零
+
+    return y_segment, sr
+
+# ✅ 每个文件互不依赖，分发到多个进程
+def _trim_one(file, input_folder, output_folder, start_time, end_time):
+    filepath = os.path.join(input_folder, file)
+
+    # 读取并裁剪音频 (已补齐到统一长度)
+    y_trimmed, sr = _read_segment(filepath, start_time, end_time)
+
+    # 保存裁剪后的音频
+    output_path = os.path.join(output_folder, file)
+    sf.write(output_path, y_trimmed, sr)
+    return f"✅ 裁剪完成: {file} -> {output_path} ({start_time}s - {end_time}s)"
 
 def manual_trim_audio(input_folder, output_folder, start_time=0.08, end_time=0.48):
     """
@@ -11,37 +52,23 @@ def manual_trim_audio(input_folder, output_folder, start_time=0.08, end_time=0.4
     :param start_time: 开始时间 (单位: 秒)
     :param end_time: 结束时间 (单位: 秒)
     """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    audio_files = [f for f in os.listdir(input_folder) if f.endswith('.wav')]
-
-    for file in audio_files:
-        filepath = os.path.join(input_folder, file)
-        y, sr = librosa.load(filepath, sr=None)  # 读取音频
-        
-        # 计算裁剪的样本索引
-        start_sample = int(start_time * sr)
-        end_sample = int(end_time * sr)
-
-        # 裁剪音频
-        y_trimmed = y[start_sample:end_sample]
+    os.makedirs(output_folder, exist_ok=True)
 
-        # 确保所有音频长度一致
-        target_length = end_sample - start_sample
-        if len(y_trimmed) < target_length:
-            padding = target_length - len(y_trimmed)
-            y_trimmed = np.pad(y_trimmed, (0, padding), mode='constant')
+    with os.scandir(input_folder) as entries:
+        audio_files = [e.name for e in entries if e.name.endswith('.wav')]
+    job = partial(_trim_one, input_folder=input_folder, output_folder=output_folder,
+                  start_time=start_time, end_time=end_time)
 
-        # 保存裁剪后的音频
-        output_path = os.path.join(output_folder, file)
-        sf.write(output_path, y_trimmed, sr)
-        print(f"✅ 裁剪完成: {file} -> {output_path} ({start_time}s - {end_time}s)")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for message in executor.map(job, audio_files, chunksize=8):
+            print(message)
 
     print("🎉 所有音频裁剪完毕！")
 
 # === 运行脚本 ===
-current_dir = os.path.dirname(os.path.abspath(__file__))
-input_folder = os.path.join(current_dir, "processed", "processed_syllables")
-output_folder = os.path.join(current_dir, "processed", "final_trimmed_syllables")
-manual_trim_audio(input_folder, output_folder, start_time=0.08, end_time=0.48)
+# 多进程处理需要 main guard (子进程会重新导入本脚本)
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_folder = os.path.join(current_dir, "processed", "processed_syllables")
+    output_folder = os.path.join(current_dir, "processed", "final_trimmed_syllables")
+    manual_trim_audio(input_folder, output_folder, start_time=0.08, end_time=0.48)
@@ -1,11 +1,13 @@
 import os
 from func_audio_processing import smooth_spectrum
 
-# 获取脚本所在目录
-current_dir = os.path.dirname(os.path.abspath(__file__))
+# 多进程处理需要 main guard (子进程会重新导入本脚本)
+if __name__ == "__main__":
+    # 获取脚本所在目录
+    current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# 调用脚本所在目录的子文件夹
-from_dir = os.path.join(current_dir, "processed", "syllables_resampled")
-to_dir = os.path.join(current_dir, "processed", "syllables_smoothed")
+    # 调用脚本所在目录的子文件夹
+    from_dir = os.path.join(current_dir, "processed", "syllables_resampled")
+    to_dir = os.path.join(current_dir, "processed", "syllables_smoothed")
 
-smooth_spectrum(from_dir, to_dir, cutoff_freq=8000)
\ No newline at end of file
+    smooth_spectrum(from_dir, to_dir, cutoff_freq=8000)
\ No newline at end of file
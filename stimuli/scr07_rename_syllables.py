@@ -23,16 +23,26 @@ vowel_normalization = {
     "i": "i"
 }
 
-def rename_and_copy_syllables(input_dir, output_dir):
+def rename_and_copy_syllables(input_dir, output_dir, use_hardlinks=False):
     """
     读取 input_dir 文件夹中的音频文件，按规则重命名并保存到 output_dir。
+    - use_hardlinks=True 时建硬链接而不复制数据 (跨设备等无法建链接时退回复制)；
+      硬链接与源文件共用同一份数据，之后重新运行 scr06 (原地改写 syllables_smoothed)
+      会悄悄改变这里的最终刺激，只在确定不再改动源文件时使用
     """
     os.makedirs(output_dir, exist_ok=True)  # 创建目标文件夹（如果不存在）
 
-    for filename in os.listdir(input_dir):
+    with os.scandir(input_dir) as entries:
+        entries = list(entries)
+
+    # 循环内用到的函数先取到局部变量，少一次属性查找
+    pjoin, splitext, lexists = os.path.join, os.path.splitext, os.path.lexists
+
+    for entry in entries:
+        filename = entry.name
         if filename.endswith('.wav'):
             # 获取文件名（去掉扩展名）
-            base_name, ext = os.path.splitext(filename)
+            base_name, ext = splitext(filename)
             
             # 检查文件名格式是否符合 (辅音 + 元音)
             if len(base_name) < 2:
@@ -57,11 +67,20 @@ def rename_and_copy_syllables(input_dir, output_dir):
             
             # 构造新文件名
             new_name = f"{prefix}_{normalized_vowel}_{consonant}{ext}"
-            input_path = os.path.join(input_dir, filename)
-            output_path = os.path.join(output_dir, new_name)
+            input_path = entry.path
+            output_path = pjoin(output_dir, new_name)
             
-            # 将文件复制并重命名到新文件夹
-            shutil.copy(input_path, output_path)
+            # 将文件以新名字复制到新文件夹；已存在的目标先删除，可重复运行
+            #   (目标可能是上次留下的硬链接，直接覆盖会写进源文件)
+            if lexists(output_path):
+                os.unlink(output_path)
+            if use_hardlinks:
+                try:
+                    os.link(input_path, output_path)
+                except OSError:
+                    shutil.copy(input_path, output_path)
+            else:
+                shutil.copy(input_path, output_path)
             print(f"Copied and renamed: '{filename}' -> '{new_name}'")
 
 # 运行重命名和复制函数
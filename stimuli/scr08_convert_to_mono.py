@@ -1,5 +1,12 @@
 import os
-from pydub import AudioSegment
+from concurrent.futures import ThreadPoolExecutor
+
+import soundfile as sf
+
+def _read_wav(path):
+    """ 返回 (y, sr, subtype)；y: (n_samples, n_channels) float32，subtype 为原始采样格式 (如 PCM_16) """
+    with sf.SoundFile(path) as f:
+        return f.read(dtype='float32', always_2d=True), f.samplerate, f.subtype
 
 def convert_to_mono(from_dir, to_dir):
     """
@@ -12,24 +19,33 @@ def convert_to_mono(from_dir, to_dir):
     # 创建目标文件夹（如果不存在）
     os.makedirs(to_dir, exist_ok=True)
 
-    # 遍历输入目录中的所有文件
-    for file in os.listdir(from_dir):
-        if file.endswith(".wav"):  # 只处理 .wav 文件
-            input_path = os.path.join(from_dir, file)
-            output_path = os.path.join(to_dir, file)
+    # 遍历输入目录中的所有 .wav 文件
+    with os.scandir(from_dir) as entries:
+        wav_entries = [e for e in entries if e.name.endswith(".wav")]
+
+    # libsndfile 读取时会释放 GIL：后台线程只预读下一个文件，与当前文件的转换、写出重叠进行
+    #   (最多同时持有两个文件，写完一个立即输出 Saved)
+    pjoin = os.path.join  # 循环内少一次属性查找
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        next_read = pool.submit(_read_wav, wav_entries[0].path) if wav_entries else None
+        for i, entry in enumerate(wav_entries):
+            y, sr, subtype = next_read.result()
+            if i + 1 < len(wav_entries):
+                next_read = pool.submit(_read_wav, wav_entries[i + 1].path)
 
-            # 加载音频文件
-            audio = AudioSegment.from_file(input_path)
+            file = entry.name
+            output_path = pjoin(to_dir, file)
 
-            # 检查是否为 stereo，并转换为 mono
-            if audio.channels > 1:
-                audio = audio.set_channels(1)  # 设置为单声道
+            # 检查是否为 stereo，并转换为 mono (各声道取平均)
+            if y.shape[1] > 1:
+                mono = y.mean(axis=1)  # 设置为单声道
                 print(f"Converted to mono: {file}")
             else:
+                mono = y[:, 0]
                 print(f"Already mono: {file}")
 
-            # 保存文件到目标目录
-            audio.export(output_path, format="wav")
+            # 保存文件到目标目录 (保持原始采样格式)
+            sf.write(output_path, mono, sr, subtype=subtype)
             print(f"Saved mono file: {output_path}")
 
 # 设置输入和输出目录